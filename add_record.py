@@ -1,11 +1,17 @@
 """Script to add records to the database from JSON files."""
 import os
-import json
+import functools
+from pathlib import Path
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
 import psycopg2
 from psycopg2.extras import DictCursor
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import Dict, Any, Tuple
 from dotenv import load_dotenv
+from bulk_load import DISH_COLUMNS, RESTAURANT_COLUMNS, analyze_tables, copy_rows, insert_menu_items
 
 # Load environment variables
 load_dotenv()
@@ -23,16 +29,17 @@ DB_CONFIG = {
     "port": os.getenv("DB_PORT", "5432")
 }
 
-def load_data() -> Tuple[List[Dict], List[Dict], List[Dict]]:
-    """Load data from JSON files."""
-    with open('data/restaurants.json', 'r', encoding='utf-8') as f:
-        restaurants = json.load(f)
-    
-    with open('data/dishes.json', 'r', encoding='utf-8') as f:
-        dishes = json.load(f)
-    
-    with open('data/restaurant_dishes.json', 'r', encoding='utf-8') as f:
-        restaurant_dishes = json.load(f)
+@functools.lru_cache(maxsize=1)
+def load_data() -> Tuple[Tuple[Dict, ...], Tuple[Dict, ...], Tuple[Dict, ...]]:
+    """Load data from JSON files, parsed once per process.
+
+    The records are returned as tuples and are shared between callers, so they
+    must not be modified.
+    """
+    data_dir = Path('data')
+    restaurants = tuple(_json.loads((data_dir / 'restaurants.json').read_bytes()))
+    dishes = tuple(_json.loads((data_dir / 'dishes.json').read_bytes()))
+    restaurant_dishes = tuple(_json.loads((data_dir / 'restaurant_dishes.json').read_bytes()))
     
     return restaurants, dishes, restaurant_dishes
 
@@ -43,44 +50,31 @@ def add_records() -> None:
         conn = psycopg2.connect(**DB_CONFIG)
         
         with conn.cursor(cursor_factory=DictCursor) as cursor:
+            # The records can be re-added from the JSON files, so skip waiting for the WAL flush
+            cursor.execute("SET LOCAL synchronous_commit = off")
+            
             # Add restaurants
-            restaurants_dict = {}
-            for restaurant in restaurants:
-                logger.info(f"Adding restaurant: {restaurant['name']}")
-                cursor.execute("""
-                    INSERT INTO restaurants (name, address, website, google_url, rating, 
-                                          phone, opening_hours, images, notes)
-                    VALUES (%(name)s, %(address)s, %(website)s, %(google_url)s, %(rating)s, 
-                           %(phone)s, %(opening_hours)s, %(images)s, %(notes)s)
-                    RETURNING id
-                """, restaurant)
-                restaurants_dict[restaurant['name']] = cursor.fetchone()[0]
+            restaurant_rows = [tuple(restaurant[name] for name, _ in RESTAURANT_COLUMNS)
+                               for restaurant in restaurants]
+            copy_rows(cursor, 'restaurants', RESTAURANT_COLUMNS, restaurant_rows)
+            logger.info(f"Added {len(restaurant_rows)} restaurants")
 
             # Add dishes
-            dishes_dict = {}
-            for dish in dishes:
-                logger.info(f"Adding dish: {dish['name']}")
-                cursor.execute("""
-                    INSERT INTO dishes (name, description, images, notes)
-                    VALUES (%(name)s, %(description)s, %(images)s, %(notes)s)
-                    RETURNING id
-                """, dish)
-                dishes_dict[dish['name']] = cursor.fetchone()[0]
+            dish_rows = [tuple(dish[name] for name, _ in DISH_COLUMNS) for dish in dishes]
+            copy_rows(cursor, 'dishes', DISH_COLUMNS, dish_rows)
+            logger.info(f"Added {len(dish_rows)} dishes")
 
             # Create relationships with prices
-            for rel in restaurant_dishes:
-                logger.info(f"Adding menu item: {rel['dish']} to {rel['restaurant']}")
-                cursor.execute("""
-                    INSERT INTO restaurant_dishes (restaurant_id, dish_id, price)
-                    VALUES (%s, %s, %s)
-                """, (restaurants_dict[rel['restaurant']], 
-                     dishes_dict[rel['dish']], 
-                     rel['price']))
+            menu_rows = [(rel['restaurant'], rel['dish'], rel['price']) for rel in restaurant_dishes]
+            added = insert_menu_items(cursor, menu_rows)
+            logger.info(f"Added {added} menu items")
 
             conn.commit()
             logger.info("Successfully added all records to database")
+        
+        analyze_tables(conn)
 
-    except psycopg2.Error as e:
+    except (psycopg2.Error, ValueError) as e:
         logger.error(f"Database error: {e}")
         conn.rollback()
         raise
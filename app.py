@@ -1,252 +1,388 @@
 """Restaurant & Dish Explorer Streamlit App"""
 import streamlit as st
+import pandas as pd
 import psycopg2
 from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
 import os
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Database connection parameters
+# Database connection parameters. DB_POOL_HOST/DB_POOL_PORT point the app at a
+# PgBouncer (transaction pooling) in front of Postgres; the seed scripts keep
+# using DB_HOST/DB_PORT so bulk COPY loads go straight to the server.
 DB_CONFIG = {
     "dbname": os.getenv("DB_NAME"),
     "user": os.getenv("DB_USER"),
     "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "port": os.getenv("DB_PORT", "5432")
+    "host": os.getenv("DB_POOL_HOST", os.getenv("DB_HOST")),
+    "port": os.getenv("DB_POOL_PORT", os.getenv("DB_PORT", "5432"))
 }
 
-def get_db_connection():
-    """Get database connection."""
-    return psycopg2.connect(**DB_CONFIG)
-
-def load_data():
-    """Load all data from database."""
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=DictCursor) as cursor:
-            # Get restaurants
-            cursor.execute("""
-                SELECT id, name, address, website, google_url, rating, 
-                       phone, opening_hours, images, notes
-                FROM restaurants
-            """)
-            restaurants = [dict(r) for r in cursor.fetchall()]
-            
-            # Get dishes
-            cursor.execute("""
-                SELECT id, name, description, images, notes
-                FROM dishes
-            """)
-            dishes = [dict(d) for d in cursor.fetchall()]
-            
-            # Get restaurant-dish relationships
-            cursor.execute("""
-                SELECT r.name as restaurant, d.name as dish, rd.price
-                FROM restaurant_dishes rd
-                JOIN restaurants r ON rd.restaurant_id = r.id
-                JOIN dishes d ON rd.dish_id = d.id
-            """)
-            restaurant_dishes = [dict(rd) for rd in cursor.fetchall()]
-            
-    return restaurants, dishes, restaurant_dishes
+# Custom CSS for image styling
+IMAGE_CSS = """
+    <style>
+        img {
+            border-radius: 10px;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+            margin: 10px 0;
+        }
+    </style>
+"""
 
-def get_restaurants_by_dish(dish_name: str, restaurants: List[Dict], relations: List[Dict]) -> List[Dict]:
-    """Get all restaurants that serve a specific dish."""
-    restaurant_names = [r["restaurant"] for r in relations if r["dish"] == dish_name]
-    return [r for r in restaurants if r["name"] in restaurant_names]
+# Upper bound on open database connections for the whole process
+POOL_MAX_CONNECTIONS = 8
 
-def get_dishes_by_restaurant(restaurant_name: str, dishes: List[Dict], relations: List[Dict]) -> List[Dict]:
-    """Get all dishes served by a specific restaurant."""
-    dish_names = [r["dish"] for r in relations if r["restaurant"] == restaurant_name]
-    return [d for d in dishes if d["name"] in dish_names]
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool that waits for a free connection instead of raising."""
 
-def get_price(restaurant_name: str, dish_name: str, relations: List[Dict]) -> int:
-    """Get the price of a dish at a specific restaurant."""
-    for r in relations:
-        if r["restaurant"] == restaurant_name and r["dish"] == dish_name:
-            return r["price"]
-    return 0
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
 
-def main():
-    st.title("🍜 Hanoi Foodie")
-    
-    # Load data
-    restaurants, dishes, restaurant_dishes = load_data()
-    
-    # Add custom CSS for image styling
-    st.markdown("""
-        <style>
-            img {
-                border-radius: 10px;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-                margin: 10px 0;
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    def getconn(self, key=None):
+        self._slots.acquire()
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+@st.cache_resource(show_spinner=False)
+def get_connection_pool() -> BlockingConnectionPool:
+    """Get the process-wide pool of warm database connections.
+
+    psycopg2 pools close any returned connection beyond `minconn`, so minconn
+    equals maxconn to keep every connection open for reuse.
+    """
+    return BlockingConnectionPool(minconn=POOL_MAX_CONNECTIONS, maxconn=POOL_MAX_CONNECTIONS, **DB_CONFIG)
+
+@st.cache_resource(show_spinner=False)
+def get_query_executor() -> ThreadPoolExecutor:
+    """Get the process-wide thread pool for running queries concurrently."""
+    return ThreadPoolExecutor(max_workers=POOL_MAX_CONNECTIONS, thread_name_prefix="query")
+
+def run_query(pool: ThreadedConnectionPool, query: str, params: tuple = (),
+              server_side: bool = False) -> List[Dict]:
+    """Run a query on a connection from `pool` and return the rows as plain dicts.
+
+    With `server_side`, rows are streamed from a named cursor in chunks of
+    2000 instead of being fetched into an intermediate list all at once.
+    """
+    for attempt in range(2):
+        conn = pool.getconn()
+        try:
+            return execute_on(conn, query, params, server_side)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # A pooled connection the server has dropped only fails once it is
+            # used; the pool discards it on return, so retry once on a fresh one
+            if attempt or not conn.closed:
+                raise
+        finally:
+            pool.putconn(conn)
+
+def execute_on(conn, query: str, params: tuple, server_side: bool) -> List[Dict]:
+    """Run a query on `conn` and return the rows as plain dicts."""
+    # Read-only queries need no BEGIN/COMMIT, and PgBouncer can release the
+    # server connection as soon as each statement finishes
+    conn.autocommit = True
+    if server_side:
+        # Named cursors only live inside a transaction, which `with conn` opens
+        with conn:
+            with conn.cursor(name="fetch_rows", cursor_factory=DictCursor) as cursor:
+                cursor.itersize = 2000
+                cursor.execute(query, params)
+                return [dict(r) for r in cursor]
+    with conn.cursor(cursor_factory=DictCursor) as cursor:
+        cursor.execute(query, params)
+        return [dict(r) for r in cursor.fetchall()]
+
+def fetch_rows(query: str, params: tuple = (), server_side: bool = False) -> List[Dict]:
+    """Run a query on a pooled connection and return the rows as plain dicts."""
+    return run_query(get_connection_pool(), query, params, server_side)
+
+def fetch_concurrently(*queries: Tuple[str, tuple]) -> List[List[Dict]]:
+    """Run independent (query, params) pairs at once, each on its own pooled connection.
+
+    psycopg2 releases the GIL while waiting on the server, so the round-trips
+    overlap. For the short indexed lookups used here that saves roughly one
+    network round-trip per extra query, less a thread hand-off and a pool
+    checkout; it relies on the pool keeping its connections warm.
+    """
+    pool = get_connection_pool()
+    executor = get_query_executor()
+    futures = [executor.submit(run_query, pool, query, params) for query, params in queries]
+    return [future.result() for future in futures]
+
+# The name lists are read-only, so they are kept as shared tuples in
+# st.cache_resource rather than copied out of st.cache_data on every rerun
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def list_dish_names() -> Tuple[str, ...]:
+    """Get the names of all dishes, sorted alphabetically."""
+    return tuple(r["name"] for r in fetch_rows("SELECT name FROM dishes ORDER BY name", server_side=True))
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def list_restaurant_names() -> Tuple[str, ...]:
+    """Get the names of all restaurants, sorted alphabetically."""
+    return tuple(r["name"] for r in fetch_rows("SELECT name FROM restaurants ORDER BY name", server_side=True))
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_dish_page(dish_name: str) -> Tuple[Optional[Dict], List[Dict]]:
+    """Get a dish's details and the restaurants serving it, with their prices."""
+    details, restaurants = fetch_concurrently(
+        ("""
+            SELECT id, name, description, images, notes
+            FROM dishes
+            WHERE name = %s
+            LIMIT 1
+        """, (dish_name,)),
+        ("""
+            SELECT r.id, r.name, r.address, r.website, r.google_url, r.rating, 
+                   r.phone, r.opening_hours, r.images, r.notes, rd.price
+            FROM restaurant_dishes rd
+            JOIN restaurants r ON rd.restaurant_id = r.id
+            JOIN dishes d ON rd.dish_id = d.id
+            WHERE d.name = %s
+            ORDER BY r.name
+        """, (dish_name,))
+    )
+    return (details[0] if details else None), restaurants
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_restaurant_page(restaurant_name: str) -> Tuple[Optional[Dict], List[Dict]]:
+    """Get a restaurant's details and the dishes it serves, with their prices."""
+    details, menu = fetch_concurrently(
+        ("""
+            SELECT id, name, address, website, google_url, rating, 
+                   phone, opening_hours, images, notes
+            FROM restaurants
+            WHERE name = %s
+            LIMIT 1
+        """, (restaurant_name,)),
+        ("""
+            SELECT d.id, d.name, d.description, d.images, d.notes, rd.price
+            FROM restaurant_dishes rd
+            JOIN restaurants r ON rd.restaurant_id = r.id
+            JOIN dishes d ON rd.dish_id = d.id
+            WHERE r.name = %s
+            ORDER BY d.name
+        """, (restaurant_name,))
+    )
+    return (details[0] if details else None), menu
+
+def show_images(images: List[str]) -> None:
+    """Display images two per row; the browser loads them straight from their URLs."""
+    cols = st.columns(2)
+    for i, img_url in enumerate(images):
+        with cols[i % 2]:
+            st.image(
+                img_url,
+                use_container_width=True,
+                output_format="JPEG"
+            )
+
+def select_row(records: List[Dict], columns: Dict[str, Any], key: str) -> Optional[Dict]:
+    """Show records as one table and return the row the user selected, if any."""
+    table = pd.DataFrame(records, columns=list(columns))
+    event = st.dataframe(
+        table,
+        hide_index=True,
+        use_container_width=True,
+        column_config=columns,
+        key=key,
+        on_select="rerun",
+        selection_mode="single-row"
+    )
+    rows = event.selection.rows
+    return records[rows[0]] if rows else None
+
+@st.fragment
+def dish_explorer():
+    """Dish tab; reruns on its own when the dish selection changes."""
+    st.header("Explore Restaurants by Dish")
     
-    # Create tabs for different exploration methods
-    tab1, tab2 = st.tabs(["Explore by Dish", "Explore by Restaurant"])
+    # Create dish selector
+    dish_names = list_dish_names()
+    selected_dish = st.selectbox("Select a Dish", dish_names)
     
-    with tab1:
-        st.header("Explore Restaurants by Dish")
+    if selected_dish:
+        # Get the dish details and the restaurants serving it
+        dish_info, restaurants_with_dish = get_dish_page(selected_dish)
+        if dish_info is None:
+            # The cached name list can outlive the dish, e.g. after a re-seed
+            st.warning(f"{selected_dish} is no longer available. Try \"Refresh data\".")
+            return
         
-        # Create dish selector
-        dish_names = sorted([dish["name"] for dish in dishes])
-        selected_dish = st.selectbox("Select a Dish", dish_names)
+        # Display dish details
+        st.subheader(f"About {selected_dish}")
+        st.write(dish_info['description'])
         
-        if selected_dish:
-            # Get the dish details
-            dish_info = next((d for d in dishes if d["name"] == selected_dish), None)
-            
-            # Display dish details
-            st.subheader(f"About {selected_dish}")
-            st.write(dish_info['description'])
-            
-            # Display dish images if available
-            images = dish_info.get('images', [])
-            if images:
-                try:
-                    # Create a container for images
-                    image_container = st.container()
-                    with image_container:
-                        cols = st.columns(2)  # Display 2 images per row
-                        for i, img_url in enumerate(images):
-                            with cols[i % 2]:
-                                st.image(
-                                    img_url,
-                                    use_container_width=True,
-                                    output_format="JPEG"
-                                )
-                except Exception as e:
-                    st.error(f"Error loading images: {str(e)}")
-            else:
-                st.info("No images available for this dish")
-            
-            if dish_info.get('notes'):
-                st.write(f"**Notes:** {dish_info['notes']}")
-            
-            # Get restaurants serving this dish
-            restaurants_with_dish = get_restaurants_by_dish(selected_dish, restaurants, restaurant_dishes)
-            
-            # Display restaurants
-            st.subheader(f"Restaurants serving {selected_dish}")
+        # Display dish images if available
+        images = dish_info.get('images', [])
+        if images:
+            try:
+                show_images(images)
+            except Exception as e:
+                st.error(f"Error loading images: {str(e)}")
+        else:
+            st.info("No images available for this dish")
+        
+        if dish_info.get('notes'):
+            st.write(f"**Notes:** {dish_info['notes']}")
+        
+        # Display restaurants
+        st.subheader(f"Restaurants serving {selected_dish}")
+        
+        if restaurants_with_dish:
+            # List every restaurant in one table and expand only the selected one
+            restaurant = select_row(restaurants_with_dish, {
+                "name": "Restaurant",
+                "price": st.column_config.NumberColumn("Price", format="₫%d"),
+                "rating": st.column_config.NumberColumn("Rating", format="%.1f/5"),
+                "address": "Address",
+                "opening_hours": "Hours"
+            }, key=f"restaurants_for_{selected_dish}")
             
-            if restaurants_with_dish:
-                for restaurant in restaurants_with_dish:
-                    # Create an expander for each restaurant
-                    price = get_price(restaurant['name'], selected_dish, restaurant_dishes)
-                    with st.expander(f"{restaurant['name']} - ₫{price:,}"):
-                        col1, col2 = st.columns(2)
-                        
-                        if restaurant.get('address'):
-                            col1.write(f"**Address:** {restaurant['address']}")
-                        if restaurant.get('phone'):
-                            col1.write(f"**Phone:** {restaurant['phone']}")
-                        
-                        if restaurant.get('rating'):
-                            col2.write(f"**Rating:** {restaurant['rating']}/5")
-                        if restaurant.get('opening_hours'):
-                            col2.write(f"**Hours:** {restaurant['opening_hours']}")
-                        
-                        if restaurant.get('website'):
-                            st.markdown(f"[Visit Website]({restaurant['website']})")
-                        
-                        if restaurant.get('google_url'):
-                            st.markdown(f"[View on Google]({restaurant['google_url']})")
+            if restaurant:
+                with st.expander(f"{restaurant['name']} - ₫{restaurant['price']:,}", expanded=True):
+                    col1, col2 = st.columns(2)
+                    
+                    if restaurant.get('address'):
+                        col1.write(f"**Address:** {restaurant['address']}")
+                    if restaurant.get('phone'):
+                        col1.write(f"**Phone:** {restaurant['phone']}")
+                    
+                    if restaurant.get('rating'):
+                        col2.write(f"**Rating:** {restaurant['rating']}/5")
+                    if restaurant.get('opening_hours'):
+                        col2.write(f"**Hours:** {restaurant['opening_hours']}")
+                    
+                    if restaurant.get('website'):
+                        st.markdown(f"[Visit Website]({restaurant['website']})")
+                    
+                    if restaurant.get('google_url'):
+                        st.markdown(f"[View on Google]({restaurant['google_url']})")
             else:
-                st.info(f"No restaurants currently serve {selected_dish}")
+                st.caption("Select a restaurant to see its details")
+        else:
+            st.info(f"No restaurants currently serve {selected_dish}")
+
+@st.fragment
+def restaurant_explorer():
+    """Restaurant tab; reruns on its own when the restaurant selection changes."""
+    st.header("Explore Dishes by Restaurant")
     
-    with tab2:
-        st.header("Explore Dishes by Restaurant")
+    # Create restaurant selector
+    restaurant_names = list_restaurant_names()
+    selected_restaurant = st.selectbox("Select a Restaurant", restaurant_names)
+    
+    if selected_restaurant:
+        # Get the restaurant details and its menu
+        restaurant_info, dishes_at_restaurant = get_restaurant_page(selected_restaurant)
+        if restaurant_info is None:
+            # The cached name list can outlive the restaurant, e.g. after a re-seed
+            st.warning(f"{selected_restaurant} is no longer available. Try \"Refresh data\".")
+            return
         
-        # Create restaurant selector
-        restaurant_names = sorted([r["name"] for r in restaurants])
-        selected_restaurant = st.selectbox("Select a Restaurant", restaurant_names)
+        # Display restaurant details
+        st.subheader(f"About {selected_restaurant}")
         
-        if selected_restaurant:
-            # Get the restaurant details
-            restaurant_info = next((r for r in restaurants if r["name"] == selected_restaurant), None)
-            
-            # Display restaurant details
-            st.subheader(f"About {selected_restaurant}")
-            
-            # Display restaurant images if available
-            images = restaurant_info.get('images', [])
-            if images:
-                try:
-                    image_container = st.container()
-                    with image_container:
-                        cols = st.columns(2)
-                        for i, img_url in enumerate(images):
-                            with cols[i % 2]:
-                                st.image(
-                                    img_url,
-                                    use_container_width=True,
-                                    output_format="JPEG"
-                                )
-                except Exception as e:
-                    st.error(f"Error loading images: {str(e)}")
-            else:
-                st.info("No images available for this restaurant")
-            
-            col1, col2 = st.columns(2)
-            
-            if restaurant_info.get('address'):
-                col1.write(f"**Address:** {restaurant_info['address']}")
-            if restaurant_info.get('phone'):
-                col1.write(f"**Phone:** {restaurant_info['phone']}")
-            
-            if restaurant_info.get('rating'):
-                col2.write(f"**Rating:** {restaurant_info['rating']}/5")
-            if restaurant_info.get('opening_hours'):
-                col2.write(f"**Hours:** {restaurant_info['opening_hours']}")
-            
-            if restaurant_info.get('notes'):
-                st.write(f"**Notes:** {restaurant_info['notes']}")
-            
-            if restaurant_info.get('website'):
-                st.markdown(f"[Visit Website]({restaurant_info['website']})")
-            
-            if restaurant_info.get('google_url'):
-                st.markdown(f"[View on Google]({restaurant_info['google_url']})")
-            
-            # Get dishes at this restaurant
-            dishes_at_restaurant = get_dishes_by_restaurant(selected_restaurant, dishes, restaurant_dishes)
-            
-            # Display dishes
-            st.subheader(f"Menu at {selected_restaurant}")
+        # Display restaurant images if available
+        images = restaurant_info.get('images', [])
+        if images:
+            try:
+                show_images(images)
+            except Exception as e:
+                st.error(f"Error loading images: {str(e)}")
+        else:
+            st.info("No images available for this restaurant")
+        
+        col1, col2 = st.columns(2)
+        
+        if restaurant_info.get('address'):
+            col1.write(f"**Address:** {restaurant_info['address']}")
+        if restaurant_info.get('phone'):
+            col1.write(f"**Phone:** {restaurant_info['phone']}")
+        
+        if restaurant_info.get('rating'):
+            col2.write(f"**Rating:** {restaurant_info['rating']}/5")
+        if restaurant_info.get('opening_hours'):
+            col2.write(f"**Hours:** {restaurant_info['opening_hours']}")
+        
+        if restaurant_info.get('notes'):
+            st.write(f"**Notes:** {restaurant_info['notes']}")
+        
+        if restaurant_info.get('website'):
+            st.markdown(f"[Visit Website]({restaurant_info['website']})")
+        
+        if restaurant_info.get('google_url'):
+            st.markdown(f"[View on Google]({restaurant_info['google_url']})")
+        
+        # Display dishes
+        st.subheader(f"Menu at {selected_restaurant}")
+        
+        if dishes_at_restaurant:
+            # List every dish in one table and expand only the selected one
+            dish = select_row(dishes_at_restaurant, {
+                "name": "Dish",
+                "price": st.column_config.NumberColumn("Price", format="₫%d"),
+                "description": "Description"
+            }, key=f"menu_at_{selected_restaurant}")
             
-            if dishes_at_restaurant:
-                for dish in dishes_at_restaurant:
-                    # Create an expander for each dish
-                    price = get_price(selected_restaurant, dish['name'], restaurant_dishes)
-                    with st.expander(f"{dish['name']} - ₫{price:,}"):
-                        images = dish.get('images', [])
-                        if images:
-                            try:
-                                image_container = st.container()
-                                with image_container:
-                                    cols = st.columns(2)
-                                    for i, img_url in enumerate(images):
-                                        with cols[i % 2]:
-                                            st.image(
-                                                img_url,
-                                                use_container_width=True,
-                                                output_format="JPEG"
-                                            )
-                            except Exception as e:
-                                st.error(f"Error loading images: {str(e)}")
-                        else:
-                            st.info("No images available for this dish")
-                        
-                        if dish.get('description'):
-                            st.write(f"**Description:** {dish['description']}")
-                        if dish.get('notes'):
-                            st.write(f"**Notes:** {dish['notes']}")
+            if dish:
+                with st.expander(f"{dish['name']} - ₫{dish['price']:,}", expanded=True):
+                    images = dish.get('images', [])
+                    if images:
+                        try:
+                            show_images(images)
+                        except Exception as e:
+                            st.error(f"Error loading images: {str(e)}")
+                    else:
+                        st.info("No images available for this dish")
+                    
+                    if dish.get('description'):
+                        st.write(f"**Description:** {dish['description']}")
+                    if dish.get('notes'):
+                        st.write(f"**Notes:** {dish['notes']}")
             else:
-                st.info(f"No dishes available at {selected_restaurant}")
+                st.caption("Select a dish to see its photos and notes")
+        else:
+            st.info(f"No dishes available at {selected_restaurant}")
+
+def main():
+    st.title("🍜 Hanoi Foodie")
+    
+    # Drop every cached query result on request
+    if st.button("Refresh data"):
+        st.cache_data.clear()
+        list_dish_names.clear()
+        list_restaurant_names.clear()
+    
+    # Add custom CSS for image styling. This has to be emitted on every full
+    # run, since Streamlit removes elements a run doesn't redraw; fragment
+    # reruns leave it alone.
+    st.markdown(IMAGE_CSS, unsafe_allow_html=True)
+    
+    # Create tabs for different exploration methods
+    tab1, tab2 = st.tabs(["Explore by Dish", "Explore by Restaurant"])
+    
+    with tab1:
+        dish_explorer()
+    
+    with tab2:
+        restaurant_explorer()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
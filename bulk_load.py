@@ -0,0 +1,137 @@
+"""Shared bulk loading helpers: binary COPY, table layouts and the menu insert."""
+import io
+import logging
+import struct
+from typing import Any, Callable, Dict, Iterable, Sequence, Tuple
+import psycopg2
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# Signature, flags field and header extension length of the binary COPY format
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+
+TEXT_OID = 25
+
+def _encode_text(value: Any) -> bytes:
+    return str(value).encode("utf-8")
+
+def _encode_float8(value: Any) -> bytes:
+    return struct.pack(">d", float(value))
+
+def _encode_text_array(values: Sequence[Any]) -> bytes:
+    """Encode a one-dimensional TEXT[] in the array binary format."""
+    if not values:
+        return struct.pack(">iii", 0, 0, TEXT_OID)
+    has_null = any(value is None for value in values)
+    parts = [struct.pack(">iiiii", 1, int(has_null), TEXT_OID, len(values), 1)]
+    for value in values:
+        if value is None:
+            parts.append(struct.pack(">i", -1))
+        else:
+            data = _encode_text(value)
+            parts.append(struct.pack(">i", len(data)) + data)
+    return b"".join(parts)
+
+# Binary encoders by column type; varchar shares the text wire format
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    "text": _encode_text,
+    "varchar": _encode_text,
+    "float8": _encode_float8,
+    "text[]": _encode_text_array,
+}
+
+# Column names and types used when bulk loading each table
+RESTAURANT_COLUMNS = (("name", "varchar"), ("address", "text"), ("website", "text"),
+                      ("google_url", "text"), ("rating", "float8"), ("phone", "varchar"),
+                      ("opening_hours", "varchar"), ("images", "text[]"), ("notes", "text"))
+DISH_COLUMNS = (("name", "varchar"), ("description", "text"),
+                ("images", "text[]"), ("notes", "text"))
+
+# Resolves the staged names to ids in one pass; when a name occurs more than
+# once the most recently added row wins
+MENU_INSERT_SQL = """
+    INSERT INTO restaurant_dishes (restaurant_id, dish_id, price)
+    SELECT r.id, d.id, v.price
+    FROM menu_import v
+    JOIN (SELECT DISTINCT ON (name) id, name FROM restaurants
+          WHERE name IN (SELECT restaurant FROM menu_import)
+          ORDER BY name, id DESC) r
+        ON r.name = v.restaurant
+    JOIN (SELECT DISTINCT ON (name) id, name FROM dishes
+          WHERE name IN (SELECT dish FROM menu_import)
+          ORDER BY name, id DESC) d
+        ON d.name = v.dish
+"""
+
+def copy_rows(cursor, table: str, columns: Sequence[Tuple[str, str]], rows: Iterable[Sequence[Any]]) -> None:
+    """Load rows into `table` with a single binary COPY ... FROM STDIN.
+
+    `columns` is a sequence of (name, type) pairs, where type is a key of ENCODERS.
+    """
+    encoders = [ENCODERS[column_type] for _, column_type in columns]
+    row_header = struct.pack(">h", len(columns))
+    null_field = struct.pack(">i", -1)
+
+    buf = io.BytesIO()
+    buf.write(COPY_HEADER)
+    for row in rows:
+        buf.write(row_header)
+        for encode, value in zip(encoders, row):
+            if value is None:
+                buf.write(null_field)
+            else:
+                data = encode(value)
+                buf.write(struct.pack(">i", len(data)))
+                buf.write(data)
+    buf.write(COPY_TRAILER)
+    buf.seek(0)
+
+    names = ", ".join(name for name, _ in columns)
+    cursor.copy_expert(f"COPY {table} ({names}) FROM STDIN WITH (FORMAT BINARY)", buf)
+
+def insert_menu_items(cursor, menu_rows: Sequence[Tuple[str, str, int]]) -> int:
+    """Insert (restaurant name, dish name, price) rows into restaurant_dishes.
+
+    Raises ValueError naming any restaurant or dish that doesn't exist, rather
+    than silently skipping its menu items.
+    """
+    cursor.execute("CREATE TEMP TABLE menu_import (restaurant TEXT, dish TEXT, price INTEGER) ON COMMIT DROP")
+    execute_values(cursor, "INSERT INTO menu_import (restaurant, dish, price) VALUES %s", menu_rows, page_size=1000)
+    
+    cursor.execute(MENU_INSERT_SQL)
+    inserted = cursor.rowcount
+    if inserted != len(menu_rows):
+        cursor.execute("""
+            SELECT DISTINCT restaurant FROM menu_import v
+            WHERE NOT EXISTS (SELECT 1 FROM restaurants r WHERE r.name = v.restaurant)
+        """)
+        unknown_restaurants = sorted(row[0] for row in cursor.fetchall())
+        cursor.execute("""
+            SELECT DISTINCT dish FROM menu_import v
+            WHERE NOT EXISTS (SELECT 1 FROM dishes d WHERE d.name = v.dish)
+        """)
+        unknown_dishes = sorted(row[0] for row in cursor.fetchall())
+        raise ValueError(
+            f"Only {inserted} of {len(menu_rows)} menu items could be added; "
+            f"unknown restaurants: {unknown_restaurants}, unknown dishes: {unknown_dishes}"
+        )
+    
+    cursor.execute("DROP TABLE menu_import")
+    return inserted
+
+def analyze_tables(conn) -> None:
+    """Refresh planner statistics after a committed load.
+
+    Failures are logged as a warning rather than raised, since the data is
+    already committed at this point.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE restaurants, dishes, restaurant_dishes")
+        conn.commit()
+    except psycopg2.Error as e:
+        logger.warning(f"Could not refresh table statistics: {e}")
+        if not conn.closed:
+            conn.rollback()
@@ -1,11 +1,17 @@
 """Script to populate the PostgreSQL database with sample data."""
 import os
-import json
+import functools
+from pathlib import Path
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
 import psycopg2
 from psycopg2.extras import DictCursor
 import logging
-from typing import List, Dict, Any
+from typing import Dict, Any
 from dotenv import load_dotenv
+from bulk_load import DISH_COLUMNS, RESTAURANT_COLUMNS, analyze_tables, copy_rows, insert_menu_items
 
 # Load environment variables
 load_dotenv()
@@ -23,16 +29,17 @@ DB_CONFIG = {
     "port": os.getenv("DB_PORT", "5432")
 }
 
-def load_sample_data() -> tuple[List[Dict], List[Dict], List[Dict]]:
-    """Load sample data from JSON files."""
-    with open('data/restaurants.json', 'r', encoding='utf-8') as f:
-        restaurants = json.load(f)
-    
-    with open('data/dishes.json', 'r', encoding='utf-8') as f:
-        dishes = json.load(f)
-    
-    with open('data/restaurant_dishes.json', 'r', encoding='utf-8') as f:
-        restaurant_dishes = json.load(f)
+@functools.lru_cache(maxsize=1)
+def load_sample_data() -> tuple[tuple[Dict, ...], tuple[Dict, ...], tuple[Dict, ...]]:
+    """Load sample data from JSON files, parsed once per process.
+
+    The records are returned as tuples and are shared between callers, so they
+    must not be modified.
+    """
+    data_dir = Path('data')
+    restaurants = tuple(_json.loads((data_dir / 'restaurants.json').read_bytes()))
+    dishes = tuple(_json.loads((data_dir / 'dishes.json').read_bytes()))
+    restaurant_dishes = tuple(_json.loads((data_dir / 'restaurant_dishes.json').read_bytes()))
     
     return restaurants, dishes, restaurant_dishes
 
@@ -73,12 +80,47 @@ def create_tables(cursor) -> None:
         )
     """)
 
+    # Indexes for the app's lookups by name and its dish -> restaurants join
+    cursor.execute("CREATE INDEX IF NOT EXISTS restaurants_name_idx ON restaurants (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS dishes_name_idx ON dishes (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS restaurant_dishes_dish_id_idx ON restaurant_dishes (dish_id)")
+
+def drop_menu_constraints(cursor) -> None:
+    """Drop the restaurant_dishes key, foreign keys and index ahead of a bulk load."""
+    cursor.execute("""
+        ALTER TABLE restaurant_dishes
+            DROP CONSTRAINT IF EXISTS restaurant_dishes_pkey,
+            DROP CONSTRAINT IF EXISTS restaurant_dishes_restaurant_id_fkey,
+            DROP CONSTRAINT IF EXISTS restaurant_dishes_dish_id_fkey
+    """)
+    cursor.execute("DROP INDEX IF EXISTS restaurant_dishes_dish_id_idx")
+
+def restore_menu_constraints(cursor) -> None:
+    """Recreate the restaurant_dishes key, foreign keys and index after a bulk load."""
+    logger.info("Restoring menu constraints...")
+    cursor.execute("""
+        ALTER TABLE restaurant_dishes
+            ADD PRIMARY KEY (restaurant_id, dish_id),
+            ADD CONSTRAINT restaurant_dishes_restaurant_id_fkey
+                FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) NOT VALID,
+            ADD CONSTRAINT restaurant_dishes_dish_id_fkey
+                FOREIGN KEY (dish_id) REFERENCES dishes(id) NOT VALID
+    """)
+    cursor.execute("CREATE INDEX restaurant_dishes_dish_id_idx ON restaurant_dishes (dish_id)")
+    
+    # Check the foreign keys with one scan each rather than per inserted row
+    cursor.execute("ALTER TABLE restaurant_dishes VALIDATE CONSTRAINT restaurant_dishes_restaurant_id_fkey")
+    cursor.execute("ALTER TABLE restaurant_dishes VALIDATE CONSTRAINT restaurant_dishes_dish_id_fkey")
+
 def seed_database(add_sample_data: bool = True) -> None:
     """Populate the database with sample data."""
     try:
         restaurants, dishes, restaurant_dishes = load_sample_data()
         conn = psycopg2.connect(**DB_CONFIG)
         with conn.cursor(cursor_factory=DictCursor) as cursor:
+            # Seed data can be reloaded from the JSON files, so skip waiting for the WAL flush
+            cursor.execute("SET LOCAL synchronous_commit = off")
+            
             # Create tables
             create_tables(cursor)
             
@@ -86,37 +128,30 @@ def seed_database(add_sample_data: bool = True) -> None:
             cursor.execute("TRUNCATE restaurants, dishes, restaurant_dishes CASCADE")
             
             if add_sample_data:
+                drop_menu_constraints(cursor)
+                
                 # Add restaurants
-                restaurants_dict = {}
-                for restaurant in restaurants:
-                    cursor.execute("""
-                        INSERT INTO restaurants (name, address, website, google_url, rating, phone, opening_hours, images, notes)
-                        VALUES (%(name)s, %(address)s, %(website)s, %(google_url)s, %(rating)s, %(phone)s, %(opening_hours)s, %(images)s, %(notes)s)
-                        RETURNING id
-                    """, restaurant)
-                    restaurants_dict[restaurant['name']] = cursor.fetchone()[0]
+                restaurant_rows = [tuple(restaurant[name] for name, _ in RESTAURANT_COLUMNS)
+                                   for restaurant in restaurants]
+                copy_rows(cursor, 'restaurants', RESTAURANT_COLUMNS, restaurant_rows)
 
                 # Add dishes
-                dishes_dict = {}
-                for dish in dishes:
-                    cursor.execute("""
-                        INSERT INTO dishes (name, description, images, notes)
-                        VALUES (%(name)s, %(description)s, %(images)s, %(notes)s)
-                        RETURNING id
-                    """, dish)
-                    dishes_dict[dish['name']] = cursor.fetchone()[0]
+                dish_rows = [tuple(dish[name] for name, _ in DISH_COLUMNS) for dish in dishes]
+                copy_rows(cursor, 'dishes', DISH_COLUMNS, dish_rows)
 
                 # Create relationships with prices
-                for rel in restaurant_dishes:
-                    cursor.execute("""
-                        INSERT INTO restaurant_dishes (restaurant_id, dish_id, price)
-                        VALUES (%s, %s, %s)
-                    """, (restaurants_dict[rel['restaurant']], dishes_dict[rel['dish']], rel['price']))
+                menu_rows = [(rel['restaurant'], rel['dish'], rel['price']) for rel in restaurant_dishes]
+                insert_menu_items(cursor, menu_rows)
+                restore_menu_constraints(cursor)
+                logger.info(f"Loaded {len(restaurant_rows)} restaurants, {len(dish_rows)} dishes "
+                            f"and {len(menu_rows)} menu items")
 
             conn.commit()
             logger.info("Database seeded successfully")
+        
+        analyze_tables(conn)
 
-    except psycopg2.Error as e:
+    except (psycopg2.Error, ValueError) as e:
         logger.error(f"Database error: {e}")
         conn.rollback()
         raise